@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ECD Batch Extractor - Пакетна обработка на повеќе ЕЦД PDF документи
+Ги обработува сите PDF фајлови од даден директориум паралелно
+"""
+
+import os
+import sys
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# orjson е ~3-10x побрз од stdlib json за серијализација; fallback на json
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+
+def _extract_one(pdf_file: str, output_dir: str) -> dict:
+    """Обработува еден PDF фајл (worker функција за процесниот pool)"""
+    # Тешките imports се одложени до worker-от за брз старт на CLI-то
+    import fitz  # PyMuPDF
+    from extract_ecd_generic import ECDExtractorGeneric
+    from extract_ecd_customs import ECDExtractorCustoms
+    from ecd_format_detector import ECDFormatDetector, ECDFormat
+
+    filename = os.path.basename(pdf_file)
+    output_file = os.path.join(output_dir, Path(pdf_file).stem + '.json')
+    result = {
+        "pdf": filename,
+        "output": os.path.basename(output_file),
+        "format": None,
+        "status": "ok",
+        "error": None,
+    }
+    try:
+        # Отвори го PDF-от еднаш и сподели го помеѓу детекторот и екстракторот
+        with fitz.open(pdf_file) as doc:
+            format_type = ECDFormatDetector(pdf_file, doc=doc).detect_format()
+            result["format"] = format_type.value
+            if format_type == ECDFormat.CUSTOMS:
+                extractor = ECDExtractorCustoms(pdf_file, doc=doc)
+            else:
+                extractor = ECDExtractorGeneric(pdf_file, doc=doc)
+            extractor.extract_all()
+            extractor.save_to_json(output_file)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
+
+def _is_up_to_date(pdf_file: str, output_file: str) -> bool:
+    """Проверува дали излезниот JSON е понов од влезниот PDF"""
+    try:
+        return os.path.getmtime(output_file) >= os.path.getmtime(pdf_file)
+    except OSError:
+        return False
+
+
+def process_directory(input_dir: str, output_dir: str, workers: int = None,
+                      report_path: str = None, verbose: bool = False,
+                      incremental: bool = False) -> list:
+    """Ги обработува сите PDF фајлови од директориумот паралелно
+
+    Ако е наведен report_path, извештајот се запишува инкрементално во
+    JSONL формат (еден JSON објект по линија) како што завршуваат
+    фајловите, наместо да се собира целата листа во меморија.
+    """
+    # os.scandir враќа DirEntry објекти со кеширан stat - еден syscall
+    # по директориум наместо glob + stat по фајл
+    pdf_files = sorted(
+        entry.path for entry in os.scandir(input_dir)
+        if entry.is_file() and entry.name.lower().endswith('.pdf')
+    )
+
+    if not pdf_files:
+        print(f"⚠️  Нема PDF фајлови во: {input_dir}")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if workers is None:
+        workers = min(os.cpu_count() or 1, 6)
+
+    print(f"📁 Пронајдени {len(pdf_files)} PDF фајлови")
+    print(f"⚙️  Обработка со {workers} паралелни процеси")
+    print("=" * 60)
+
+    results = []
+
+    # Инкрементален режим: прескокни фајлови чиј JSON е веќе ажурен
+    if incremental:
+        remaining = []
+        for pdf_file in pdf_files:
+            output_file = os.path.join(output_dir, Path(pdf_file).stem + '.json')
+            if _is_up_to_date(pdf_file, output_file):
+                results.append({
+                    "pdf": os.path.basename(pdf_file),
+                    "output": os.path.basename(output_file),
+                    "format": None,
+                    "status": "skipped",
+                    "error": None,
+                })
+            else:
+                remaining.append(pdf_file)
+        if results:
+            print(f"⏭️  Прескокнати {len(results)} веќе обработени фајлови")
+        pdf_files = remaining
+        if not pdf_files:
+            return results
+
+    report_file = open(report_path, 'wb') if report_path else None
+    try:
+        # fork start method (каде што постои): worker-ите ги делат веќе
+        # вчитаните модули преку copy-on-write наместо секој да ги
+        # re-импортира PyMuPDF и OCR stack-от
+        if 'fork' in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context('fork')
+        else:
+            mp_context = None
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=mp_context) as executor:
+            futures = {
+                executor.submit(_extract_one, pdf_file, output_dir): pdf_file
+                for pdf_file in pdf_files
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                # Една агрегирана прогрес-линија; по-фајл детали само со
+                # --verbose (грешките се печатат секогаш)
+                if result["status"] != "ok":
+                    print(f"\r[{i}/{len(pdf_files)}] ❌ {result['pdf']}: {result['error']}")
+                elif verbose:
+                    print(f"[{i}/{len(pdf_files)}] ✅ {result['pdf']} -> {result['output']}")
+                else:
+                    sys.stdout.write(f"\r   Обработени {i}/{len(pdf_files)}")
+                    sys.stdout.flush()
+                if report_file is not None:
+                    report_file.write(_dumps(result) + b"\n")
+                results.append(result)
+    finally:
+        if report_file is not None:
+            report_file.close()
+
+    if not verbose and results:
+        sys.stdout.write("\n")
+
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Пакетно извлекување на податоци од ЕЦД PDF документи'
+    )
+    parser.add_argument(
+        'input_dir',
+        help='Директориум со PDF фајлови'
+    )
+    parser.add_argument(
+        '-o', '--output-dir',
+        default='extracted',
+        help='Директориум за излезните JSON фајлови (default: extracted)'
+    )
+    parser.add_argument(
+        '-r', '--report',
+        help='Патека до JSONL фајл со извештај (еден JSON објект по линија)'
+    )
+    parser.add_argument(
+        '-i', '--incremental',
+        action='store_true',
+        help='Прескокни PDF фајлови чиј JSON излез е понов од PDF-от'
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Прикажи линија за секој обработен фајл'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Број на паралелни процеси (default: min(cpu_count, 6))'
+    )
+
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 ECD Batch Extractor")
+    print("=" * 60)
+
+    results = process_directory(args.input_dir, args.output_dir, args.workers,
+                                report_path=args.report, verbose=args.verbose,
+                                incremental=args.incremental)
+
+    ok_count = sum(1 for r in results if r["status"] == "ok")
+    skipped_count = sum(1 for r in results if r["status"] == "skipped")
+    error_count = len(results) - ok_count - skipped_count
+
+    print("=" * 60)
+    print(f"✅ Успешно: {ok_count}")
+    if skipped_count:
+        print(f"⏭️  Прескокнати: {skipped_count}")
+    if error_count:
+        print(f"❌ Грешки: {error_count}")
+
+    if args.report:
+        print(f"📊 Извештај зачуван во: {args.report}")
+
+    return 0 if error_count == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
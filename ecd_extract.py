@@ -6,13 +6,14 @@ ECD PDF Extractor - Универзална скрипта за извлекув
 """
 
 import sys
-import argparse
-from extract_ecd_generic import ECDExtractorGeneric
-from extract_ecd_customs import ECDExtractorCustoms
-from ecd_format_detector import detect_ecd_format, ECDFormat
 
 
 def main():
+    # Одложени imports: argparse се вчитува дури при повик, а тешките
+    # модули (PyMuPDF, OCR stack) дури откако аргументите се валидни -
+    # па --help и грешни аргументи не го плаќаат стартот на PDF stack-от
+    import argparse
+
     parser = argparse.ArgumentParser(
         description='Извлекува податоци од ЕЦД PDF документи во JSON формат'
     )
@@ -36,7 +37,11 @@ def main():
     )
     
     args = parser.parse_args()
-    
+
+    from extract_ecd_generic import ECDExtractorGeneric
+    from extract_ecd_customs import ECDExtractorCustoms
+    from ecd_format_detector import detect_ecd_format, ECDFormat
+
     try:
         print("=" * 60)
         print("🚀 ECD PDF Extractor")
@@ -5,162 +5,391 @@ ECD Customs Format Extractor - Екстрактор за царински фор
 Специјализиран за документи како ECDcarina.pdf
 """
 
+import bisect
 import fitz  # PyMuPDF
+import json
 import re
+import string
+import sys
 from typing import Dict, List, Optional, Any, Tuple
-from extract_ecd_generic import ECDExtractorGeneric
+# Идентичните шаблони/множества се споделуваат со генеричкиот модул -
+# еден компајлиран објект по шаблон за целиот процес
+from extract_ecd_generic import (ECDExtractorGeneric, _MODE_DIGITS,
+                                 _RE_TWO_LETTERS)
+
+
+# Прекомпајлирани шаблони - методите ги користат во циклуси по линии,
+# па компајлирањето се плаќа еднаш на module load
+_RE_EXIM = re.compile(r'^(EX|IM)[A-Z]{2}$')
+_RE_VEHICLE = re.compile(r'([A-Z]{2}\d{4}[A-Z]{2}(?:/[A-Z]{2}\d{4}[A-Z]{2})?)')
+_RE_COUNTRY_PREFIX = re.compile(r'^([A-Z]{2})\s')
+_RE_TWO_LETTER_WORD = re.compile(r'\b([A-Z]{2})\b')
+_RE_PLACE_CODE = re.compile(r'(MK)?(\d{6})')
+_RE_NUMBER_ONLY = re.compile(r'^\d+\.?\d*$')
+_RE_TIN = re.compile(r'([A-Z]{2}\d{13})')
+_RE_POSTAL_SUFFIX = re.compile(r'\s(\d{4,5})\s*$')
+_RE_POSTAL_LINE = re.compile(r'^\d{4,6}$')
+_RE_CC8 = re.compile(r'\b(\d{8})\b')
+_RE_PACK_ANY = re.compile(r'(Взаемно определено|Палета|Картон|Кутија|Сандак)-\d+-[A-Z]{2}')
+_RE_PACK_OLD = re.compile(r'определено-(\d+)-([A-Z]{2})')
+_RE_PACK_NEW = re.compile(r'(Палета|Картон|Кутија|Сандак|Врека|Контејнер)-(\d+)-([A-Z]{2})')
+_RE_DASH_SPACE = re.compile(r'-\s+')
+# Валидните типови документи се дел од самиот pattern - C-движокот ги
+# отфрла невалидните кандидати пред Python воопшто да ги види
+_RE_DOC_VALID = re.compile(
+    r'\b(AUN|POAN|5016|5011|Y024|5010|5069|T010|E042|2037)'
+    r'-([A-Z\d]+(?:/[A-Z\d]+)?)'
+)
+
+# Секциски анкери: еден finditer низ self.text ги наоѓа линиите на сите
+# маркери одеднаш, наместо секој метод одделно да ги скенира линиите
+# Translate табели што бришат кирилица/големи букви: ако должината се
+# промени после translate, линијата содржи таков карактер. Скенот оди
+# во C наместо Python циклус по карактер.
+_CYR_DEL = str.maketrans('', '', ''.join(chr(c) for c in range(0x0410, 0x0450)))
+_UPPER_DEL = str.maketrans('', '', string.ascii_uppercase)
+
+# Префикси на нумерирани полиња - str.startswith со tuple е еден
+# C-повик наместо синџир од одделни тестови
+_FIELD_PREFIXES = ('32 ', '33 ', '34 ', '35 ', '37 ', '38 ', '39 ',
+                   '40 ', '41 ', '44 ', '46 ')
+_DOC_END_PREFIXES = ('46 ', '47 ', '31 ', 'Шифр')
+
+# Членство во frozenset е O(1) и не гради листа при секој повик -
+# овие тестови се во жешките циклуси на extract_heahea
+_EXCL_COUNTRY = frozenset({'MK', 'БР', 'УЛ', 'SI'})
+_EXCL_COUNTRY2 = frozenset({'MK', 'БР', 'УЛ'})
+
+# Маркер за тарифна ознака - опфаќа "33 Тарифн..." и "Тарифна ознака"
+_RE_TARIF = re.compile(r'33 Тарифн|Тарифна ознака')
+
+_RE_ANCHORS = re.compile(
+    r"(?m:^[ \t]*(?P<exim>(?:EX|IM)[A-Z]{2})[ \t]*$)"
+    r"|(?P<cons>Consignor ?/ ?Exporter)"
+    r"|(?P<cons2>2 Consignor)"
+    r"|(?P<prim>8 Примач)"
+    r"|(?P<gross35>35 Бруто маса)"
+    r"|(?P<doc44>44 Дополнителни)"
+)
+
+
+def _first_float(s: str) -> Optional[float]:
+    """Враќа прв број од линијата (цифри + опционална точка) или None.
+
+    Рачен линеарен скен - за кратки линии е побрз од повик на regex
+    движокот, а никогаш не произведува невалиден број (нема try/except).
+    """
+    n = len(s)
+    i = 0
+    while i < n and not ('0' <= s[i] <= '9'):
+        i += 1
+    if i == n:
+        return None
+    start = i
+    while i < n and '0' <= s[i] <= '9':
+        i += 1
+    if i < n and s[i] == '.':
+        i += 1
+        while i < n and '0' <= s[i] <= '9':
+            i += 1
+    return float(s[start:i])
+
+
+def _noop(*args, **kwargs):
+    """Празен логер за не-verbose режим"""
+
+
+def _is_desc_candidate(line: str) -> bool:
+    """Дали линијата изгледа како опис на стока (чисто линиски тест)"""
+    if len(line) < 5:
+        return False
+    # Маркери и полиња што никогаш не се опис
+    if 'Ознаки и броеви' in line or line.startswith('33 ') or line.isdigit():
+        return False
+    # Линии со пакување ("Взаемно определено-X-YY", "Палета-X-YY") и слично
+    if (_RE_PACK_ANY.search(line) or
+        'на стока' in line or 'опис' in line or 'Колети' in line or
+            line.startswith('31 ')):
+        return False
+    # Мора да содржи кирилични или латинични букви, да не е нумерирано
+    # поле и да не е само број или 2-буквен код
+    return ((len(line.translate(_CYR_DEL)) != len(line) or
+             len(line.translate(_UPPER_DEL)) != len(line)) and
+            not line.startswith(_FIELD_PREFIXES) and
+            'Бруто маса' not in line and
+            'Нето маса' not in line and
+            'Квота' not in line and
+            'ПОСТАПКА' not in line and
+            not _RE_NUMBER_ONLY.match(line) and
+            not _RE_TWO_LETTERS.match(line))
 
 
 class ECDExtractorCustoms(ECDExtractorGeneric):
     """Екстрактор специјализиран за царински формат на ЕЦД"""
     
-    def __init__(self, pdf_path: str, verbose: bool = False):
-        super().__init__(pdf_path, verbose)
+    def __init__(self, pdf_path: str, verbose: bool = False, doc=None):
+        super().__init__(pdf_path, verbose, doc=doc)
         # Повикај ја родителската __init__ која ја поставува структурата
-    
+        self._line_starts = None
+        self._anchor_lines = None
+        self._lines_lower = None
+        self._lines_stripped = None
+        self._desc_mask = None
+        # No-op логер кога не е verbose - повиците во циклусите немаат
+        # по една if-гранка секој
+        self._log = print if verbose else _noop
+
+    def _get_lines_lower(self) -> tuple:
+        """Ленив кеш со lowercase верзии на линиите.
+
+        Case-insensitive тестовите во циклусите читаат од кешот наместо
+        да ја lower-ираат истата линија при секој кандидат.
+        """
+        if self._lines_lower is None:
+            self._lines_lower = tuple(l.lower() for l in self.lines)
+        return self._lines_lower
+
+    def _get_lines_stripped(self) -> tuple:
+        """Ленив кеш со strip-нати верзии на линиите.
+
+        Методите за извлекување ја стрипуваат истата линија по неколку
+        пати низ преклопувачки прозорци - кешот прави по една алокација
+        по линија за целиот документ.
+        """
+        if self._lines_stripped is None:
+            self._lines_stripped = tuple(l.strip() for l in self.lines)
+        return self._lines_stripped
+
+    def _get_desc_mask(self) -> tuple:
+        """Ленив bitmap: по една проверка по линија дали е кандидат-опис.
+
+        Тестовите се чисто линиски, па се пресметуваат еднаш за целиот
+        документ наместо ~15 тестови по кандидат по ставка.
+        """
+        if self._desc_mask is None:
+            self._desc_mask = tuple(
+                _is_desc_candidate(l) for l in self._get_lines_stripped()
+            )
+        return self._desc_mask
+
+    def _get_line_starts(self) -> List[int]:
+        """Ленива листа со почетните offset-и на линиите во self.text.
+
+        Со оваа листа скеновите може да работат врз self.text како една
+        голема низа (finditer во C), а offset -> линија се пресметува со
+        bisect наместо со нов помин по линии.
+        """
+        if self._line_starts is None:
+            line_starts = []
+            pos = 0
+            for line in self.lines:
+                line_starts.append(pos)
+                pos += len(line) + 1
+            self._line_starts = line_starts
+        return self._line_starts
+
+    def _get_anchor_lines(self) -> Dict[str, List[int]]:
+        """Ленив индекс: линиски позиции на секциските анкери.
+
+        Еден finditer во C низ целиот текст наместо повеќе Python
+        циклуси по линии.
+        """
+        if self._anchor_lines is None:
+            line_starts = self._get_line_starts()
+            index = {}
+            for match in _RE_ANCHORS.finditer(self.text):
+                line_idx = bisect.bisect_right(line_starts, match.start()) - 1
+                index.setdefault(match.lastgroup, []).append(line_idx)
+            self._anchor_lines = index
+        return self._anchor_lines
+
+    def _first_anchor_in_range(self, name: str, start: int, end: int) -> int:
+        """Прва линија со дадениот анкер во [start, end) или -1"""
+        positions = self._get_anchor_lines().get(name)
+        if not positions:
+            return -1
+        k = bisect.bisect_left(positions, start)
+        if k < len(positions) and positions[k] < end:
+            return positions[k]
+        return -1
+
     def find_data_section(self):
         """Наоѓа ја секцијата со вистинските податоци за царински формат"""
         # Во царинскиот формат, податоците почнуваат после РБД
-        for i, line in enumerate(self.lines):
-            # Барај линија со EXMK или IMMK
-            if re.match(r'^(EX|IM)[A-Z]{2}$', line.strip()):
-                self.data_start_index = max(0, i - 5)  # Почни малку порано
-                if self.verbose:
-                    print(f"   Почеток на податоци на линија: {self.data_start_index}")
-                return self.data_start_index
-            
-            # Алтернативно, барај "Consignor/Exporter"
-            if 'Consignor/Exporter' in line or 'Consignor / Exporter' in line:
-                self.data_start_index = i
-                if self.verbose:
-                    print(f"   Почеток на податоци на линија: {i} (Consignor маркер)")
-                return i
-        
+        anchors = self._get_anchor_lines()
+        exim = anchors.get('exim')
+        cons = anchors.get('cons')
+
+        # Барај линија со EXMK или IMMK; алтернативно "Consignor/Exporter"
+        # - која било што се појавува прва
+        if exim and (not cons or exim[0] <= cons[0]):
+            self.data_start_index = max(0, exim[0] - 5)  # Почни малку порано
+            self._log(f"   Почеток на податоци на линија: {self.data_start_index}")
+            return self.data_start_index
+
+        if cons:
+            self.data_start_index = cons[0]
+            self._log(f"   Почеток на податоци на линија: {cons[0]} (Consignor маркер)")
+            return cons[0]
+
         # Ако не го најдовме, земи од линија 10
         self.data_start_index = 10
         return 10
     
     def extract_heahea(self):
         """Извлекува податоци за HEAHEA секцијата (царински формат)"""
-        # Total gross mass - барај "Бруто маса" и земи го следниот број
-        for i, line in enumerate(self.lines):
-            if 'Бруто маса' in line:
-                # Следните неколку линии содржат маса
-                for j in range(i + 1, min(i + 5, len(self.lines))):
-                    mass_line = self.lines[j].strip()
-                    # Барај број со можен decimal point
-                    mass_match = re.search(r'(\d+\.?\d*)', mass_line)
-                    if mass_match:
-                        try:
-                            self.data["HEAHEA"]["TotGroMasHEA307"] = float(mass_match.group(1))
-                            break
-                        except ValueError:
-                            pass
-                break
-        
-        # Identity of means of transport - барај pattern XX1234YY или XX1234YY/XX1234YY
-        vehicle_pattern = r'([A-Z]{2}\d{4}[A-Z]{2}(?:/[A-Z]{2}\d{4}[A-Z]{2})?)'
-        for i in range(self.data_start_index, min(len(self.lines), self.data_start_index + 80)):
-            line = self.lines[i].strip()
-            match = re.search(vehicle_pattern, line)
-            if match:
-                self.data["HEAHEA"]["IdeOfMeaOfTraAtDHEA78"] = match.group(1)
-                # Следната линија или во истата линија може да е националноста
-                # Барај во истата линија по возилото
-                rest_of_line = line[match.end():].strip()
-                country_match = re.match(r'^([A-Z]{2})\s', rest_of_line)
-                if country_match:
-                    self.data["HEAHEA"]["NatOfMeaOfTraCroHEA87"] = country_match.group(1)
-                else:
-                    # Или во следната линија
-                    next_idx, next_line = self.find_next_nonempty_line(i + 1, 3)
-                    if next_line and re.match(r'^[A-Z]{2}$', next_line):
-                        self.data["HEAHEA"]["NatOfMeaOfTraCroHEA87"] = next_line
-                break
-        
-        # Mode of transport at the border - барај во контекст на "Вид на" и "на граница"
-        for i, line in enumerate(self.lines):
-            if 'на граница' in line or 'Вид на' in line:
-                # Барај број 1-9 во близина
-                for j in range(max(0, i - 2), min(len(self.lines), i + 3)):
-                    mode_line = self.lines[j].strip()
-                    if mode_line in ['1', '2', '3', '4', '5', '6', '7', '8', '9']:
-                        self.data["HEAHEA"]["TraModAtBorHEA76"] = mode_line
+        lines = self.lines
+        lines_stripped = self._get_lines_stripped()
+        n = len(lines)
+        dsi = self.data_start_index
+
+        # Еден помин низ линиите: секое поле има свој trigger и мал
+        # прозорец околу него, наместо посебен скен низ целиот документ
+        # за секое поле одделно
+        mass_done = vehicle_done = mode_done = False
+        dispatch_done = dest_done = container_done = place_done = False
+        fields_left = 7  # ран излез кога сите полиња се пополнети
+        prim_index = -1  # прва појава на '8 Примач' (fallback за намена)
+
+        # Вредностите се собираат локално и се запишуваат на крај, за
+        # редоследот на клучевите во HEAHEA да не зависи од редоследот
+        # на погодоците во документот
+        total_mass = vehicle_id = nationality = mode_value = None
+        dispatch_code = dest_code = container_ind = place = None
+
+        for i, line in enumerate(lines):
+            # Total gross mass - барај "Бруто маса" и земи го следниот број
+            if not mass_done and 'Бруто маса' in line:
+                mass_done = True
+                fields_left -= 1
+                for j in range(i + 1, min(i + 5, n)):
+                    mass = _first_float(lines_stripped[j])
+                    if mass is not None:
+                        total_mass = mass
                         break
-                if "TraModAtBorHEA76" in self.data["HEAHEA"]:
-                    break
-        
-        # Country of dispatch code - барај MK после "Шифра на земја"
-        for i, line in enumerate(self.lines):
-            if 'Земја на поаѓање' in line or '15 Шифра на земја' in line:
-                # Барај MK во следните линии
-                for j in range(i, min(len(self.lines), i + 10)):
-                    if 'a MK' in self.lines[j] or self.lines[j].strip() == 'MK':
-                        self.data["HEAHEA"]["CouOfDisCodHEA55"] = "MK"
+
+            stripped = lines_stripped[i]
+
+            # Identity of means of transport - pattern XX1234YY или
+            # XX1234YY/XX1234YY, во прозорец после почетокот на податоците
+            if not vehicle_done and dsi <= i < dsi + 80:
+                match = _RE_VEHICLE.search(stripped)
+                if match:
+                    vehicle_done = True
+                    fields_left -= 1
+                    vehicle_id = match.group(1)
+                    # Националноста може да е во истата линија по возилото
+                    rest_of_line = stripped[match.end():].strip()
+                    country_match = _RE_COUNTRY_PREFIX.match(rest_of_line)
+                    if country_match:
+                        nationality = country_match.group(1)
+                    else:
+                        # Или во следната линија
+                        next_idx, next_line = self.find_next_nonempty_line(i + 1, 3)
+                        if next_line and _RE_TWO_LETTERS.match(next_line):
+                            nationality = next_line
+
+            # Mode of transport at the border - број 1-9 околу "на граница"
+            if not mode_done and ('на граница' in line or 'Вид на' in line):
+                for j in range(max(0, i - 2), min(n, i + 3)):
+                    mode_line = lines_stripped[j]
+                    if mode_line in _MODE_DIGITS:
+                        mode_value = mode_line
+                        mode_done = True
+                        fields_left -= 1
                         break
-                if "CouOfDisCodHEA55" in self.data["HEAHEA"]:
-                    break
-        
-        # Country of destination code - барај земја во "17 Земја на намена"
-        for i, line in enumerate(self.lines):
-            if '17 Земја на намена' in line or 'Земја на намена' in line:
-                # Следните линии содржат земја и код
-                for j in range(i + 1, min(len(self.lines), i + 5)):
-                    dest_line = self.lines[j].strip()
+
+            # Country of dispatch code - барај MK после "Шифра на земја"
+            if not dispatch_done and ('Земја на поаѓање' in line or '15 Шифра на земја' in line):
+                for j in range(i, min(n, i + 10)):
+                    if 'a MK' in lines[j] or lines_stripped[j] == 'MK':
+                        dispatch_code = "MK"
+                        dispatch_done = True
+                        fields_left -= 1
+                        break
+
+            # Country of destination code - земја во "17 Земја на намена"
+            if not dest_done and ('17 Земја на намена' in line or 'Земја на намена' in line):
+                for j in range(i + 1, min(n, i + 5)):
+                    dest_line = lines_stripped[j]
                     # Барај 2-буквен код што не е MK
-                    code_match = re.search(r'\b([A-Z]{2})\b', dest_line)
-                    if code_match and code_match.group(1) not in ['MK', 'БР', 'УЛ', 'SI']:
-                        self.data["HEAHEA"]["CouOfDesCodHEA30"] = code_match.group(1)
+                    code_match = _RE_TWO_LETTER_WORD.search(dest_line)
+                    if code_match and code_match.group(1) not in _EXCL_COUNTRY:
+                        dest_code = code_match.group(1)
+                        dest_done = True
+                        fields_left -= 1
                         break
-                if "CouOfDesCodHEA30" in self.data["HEAHEA"]:
-                    break
-        
-        # Ако не е најдена преку "17 Земја на намена", барај во примач
-        if "CouOfDesCodHEA30" not in self.data["HEAHEA"]:
-            # Барај "SI" или друга земја во контекст на примач
-            for i, line in enumerate(self.lines):
-                if '8 Примач' in line:
-                    # Барај земја код во следните 15 линии
-                    for j in range(i + 1, min(len(self.lines), i + 15)):
-                        country_line = self.lines[j].strip()
-                        if re.match(r'^[A-Z]{2}$', country_line) and country_line not in ['MK', 'БР', 'УЛ']:
-                            self.data["HEAHEA"]["CouOfDesCodHEA30"] = country_line
-                            break
-                    break
-        
-        # Container indicator - барај 0 или 1 во контекст на возило
-        for i in range(self.data_start_index, min(len(self.lines), self.data_start_index + 60)):
-            line = self.lines[i].strip()
-            if line == '0' or line == '1':
-                # Провери контекст - дали е блиску до превозно средство или услови на испорака
-                prev_context = ' '.join(self.lines[max(0, i-3):i])
-                next_context = ' '.join(self.lines[i+1:min(len(self.lines), i+4)])
-                
-                if ('DAP' in next_context or 'FCA' in next_context or 'CPT' in next_context or
-                    'транспорт' in prev_context.lower()):
-                    self.data["HEAHEA"]["ConIndHEA96"] = line
-                    break
-        
-        # Declaration place - барај "Излезен царински орган" и земи 4-цифрен код
-        for i, line in enumerate(self.lines):
-            if 'Излезен царински орган' in line or '29 Излезен' in line:
-                # Следната линија содржи код и место
-                for j in range(i + 1, min(len(self.lines), i + 5)):
-                    place_line = self.lines[j].strip()
-                    # Барај 4-цифрен код (може да е со или без MK)
-                    place_match = re.search(r'(MK)?(\d{6})', place_line)
+
+            if prim_index < 0 and '8 Примач' in line:
+                prim_index = i
+
+            # Container indicator - 0 или 1 во контекст на превоз/испорака.
+            # Маркерите се тестираат директно по линија (со ран излез на
+            # првиот погодок) наместо да се спојуваат линиите во контекст
+            if (not container_done and dsi <= i < dsi + 60 and
+                    (stripped == '0' or stripped == '1')):
+                next_hit = any(
+                    m in lines[k]
+                    for k in range(i + 1, min(n, i + 4))
+                    for m in ('DAP', 'FCA', 'CPT')
+                )
+                lines_lower = self._get_lines_lower()
+                if next_hit or any(
+                        'транспорт' in lines_lower[k]
+                        for k in range(max(0, i - 3), i)):
+                    container_ind = stripped
+                    container_done = True
+                    fields_left -= 1
+
+            # Declaration place - "Излезен царински орган" и 6-цифрен код
+            if not place_done and ('Излезен царински орган' in line or '29 Излезен' in line):
+                for j in range(i + 1, min(n, i + 5)):
+                    place_line = lines_stripped[j]
+                    place_match = _RE_PLACE_CODE.search(place_line)
                     if place_match:
                         code = place_match.group(2)
                         # Земи го и името ако постои
                         remaining = place_line[place_match.end():].strip()
                         if remaining:
-                            self.data["HEAHEA"]["DecPlaHEA394"] = f"{code} {remaining}"
+                            place = f"{code} {remaining}"
                         else:
-                            self.data["HEAHEA"]["DecPlaHEA394"] = code
+                            place = code
+                        place_done = True
+                        fields_left -= 1
                         break
-                if "DecPlaHEA394" in self.data["HEAHEA"]:
+
+            # Сите 7 полиња се пополнети - остатокот од документот
+            # нема што да додаде
+            if fields_left == 0:
+                break
+
+        # Ако намената не е најдена преку "17 Земја на намена", барај ја
+        # во земјата на примачот
+        if not dest_done and prim_index >= 0:
+            for j in range(prim_index + 1, min(n, prim_index + 15)):
+                country_line = lines_stripped[j]
+                if _RE_TWO_LETTERS.match(country_line) and country_line not in _EXCL_COUNTRY2:
+                    dest_code = country_line
                     break
-    
+
+        heahea = self.data["HEAHEA"]
+        if total_mass is not None:
+            heahea["TotGroMasHEA307"] = total_mass
+        if vehicle_id is not None:
+            heahea["IdeOfMeaOfTraAtDHEA78"] = vehicle_id
+        if nationality is not None:
+            heahea["NatOfMeaOfTraCroHEA87"] = nationality
+        if mode_value is not None:
+            heahea["TraModAtBorHEA76"] = mode_value
+        if dispatch_code is not None:
+            heahea["CouOfDisCodHEA55"] = dispatch_code
+        if dest_code is not None:
+            heahea["CouOfDesCodHEA30"] = dest_code
+        if container_ind is not None:
+            heahea["ConIndHEA96"] = container_ind
+        if place is not None:
+            heahea["DecPlaHEA394"] = place
+
     def extract_traexpex1(self):
         """Извлекува податоци за испраќачот (TRAEXPEX1) - царински формат"""
         # Во царинскиот формат податоците се распоредени така:
@@ -173,62 +402,63 @@ class ECDExtractorCustoms(ECDExtractorGeneric):
         # Линија N+6: Град
         # Линија N+7: Земја (2-буквен код)
         
-        # Барај "Consignor/Exporter"
-        for i, line in enumerate(self.lines):
-            if 'Consignor/Exporter' in line or '2 Consignor' in line:
-                # Името е на следната линија (i+1)
-                if i + 1 < len(self.lines):
-                    name_line = self.lines[i + 1].strip()
-                    if name_line and len(name_line) > 3 and name_line != 'Не':
-                        self.data["TRAEXPEX1"]["NamEX17"] = name_line
-                
-                # Адресата е на линија i+2
-                if i + 2 < len(self.lines):
-                    addr_line = self.lines[i + 2].strip()
-                    if addr_line and addr_line != 'Не':
-                        # Зачувај ја адресата
-                        self.data["TRAEXPEX1"]["StrAndNumEX122"] = addr_line
-                        
-                # TIN е на линија i+4 (после "Не" на i+3)
-                if i + 4 < len(self.lines):
-                    tin_line = self.lines[i + 4].strip()
-                    tin_match = re.search(r'([A-Z]{2}\d{13})', tin_line)
-                    if tin_match:
-                        self.data["TRAEXPEX1"]["TINEX159"] = tin_match.group(1)
-                
-                # Градот е на линија i+6 (после точка на i+5)
-                if i + 6 < len(self.lines):
-                    city_line = self.lines[i + 6].strip()
-                    if (city_line and len(city_line) > 2 and len(city_line) < 30 and 
-                        city_line != 'MK' and city_line != 'Не' and city_line != '.'):
-                        self.data["TRAEXPEX1"]["CitEX124"] = city_line
-                
-                # Земјата е на линија i+7 (2-буквен код)
-                if i + 7 < len(self.lines):
-                    country_line = self.lines[i + 7].strip()
-                    if re.match(r'^[A-Z]{2}$', country_line):
-                        if country_line == "MK":
-                            self.data["TRAEXPEX1"]["CouEX125"] = "МК"
-                        else:
-                            self.data["TRAEXPEX1"]["CouEX125"] = country_line
-                
-                # Поштенски код - барај во адресата или во следните линии
-                # Прво провери дали е во адресата (формат: "Билеша 50/10,Белград" или со број на крај)
-                if "StrAndNumEX122" in self.data["TRAEXPEX1"]:
-                    addr = self.data["TRAEXPEX1"]["StrAndNumEX122"]
-                    postal_match = re.search(r'\s(\d{4,5})\s*$', addr)
-                    if postal_match:
-                        self.data["TRAEXPEX1"]["PosCodEX123"] = postal_match.group(1)
+        # Барај "Consignor/Exporter" преку анкерниот индекс
+        anchors = self._get_anchor_lines()
+        lines_stripped = self._get_lines_stripped()
+        candidates = anchors.get('cons', []) + anchors.get('cons2', [])
+        if candidates:
+            i = min(candidates)
+            # Името е на следната линија (i+1)
+            if i + 1 < len(self.lines):
+                name_line = lines_stripped[i + 1]
+                if name_line and len(name_line) > 3 and name_line != 'Не':
+                    self.data["TRAEXPEX1"]["NamEX17"] = name_line
+            
+            # Адресата е на линија i+2
+            if i + 2 < len(self.lines):
+                addr_line = lines_stripped[i + 2]
+                if addr_line and addr_line != 'Не':
+                    # Зачувај ја адресата
+                    self.data["TRAEXPEX1"]["StrAndNumEX122"] = addr_line
+                    
+            # TIN е на линија i+4 (после "Не" на i+3)
+            if i + 4 < len(self.lines):
+                tin_line = lines_stripped[i + 4]
+                tin_match = _RE_TIN.search(tin_line)
+                if tin_match:
+                    self.data["TRAEXPEX1"]["TINEX159"] = tin_match.group(1)
+            
+            # Градот е на линија i+6 (после точка на i+5)
+            if i + 6 < len(self.lines):
+                city_line = lines_stripped[i + 6]
+                if (city_line and len(city_line) > 2 and len(city_line) < 30 and 
+                    city_line != 'MK' and city_line != 'Не' and city_line != '.'):
+                    self.data["TRAEXPEX1"]["CitEX124"] = city_line
+            
+            # Земјата е на линија i+7 (2-буквен код)
+            if i + 7 < len(self.lines):
+                country_line = lines_stripped[i + 7]
+                if _RE_TWO_LETTERS.match(country_line):
+                    if country_line == "MK":
+                        self.data["TRAEXPEX1"]["CouEX125"] = "МК"
                     else:
-                        # Барај во следните линии
-                        for j in range(i + 5, min(i + 10, len(self.lines))):
-                            postal_line = self.lines[j].strip()
-                            if postal_line.isdigit() and len(postal_line) >= 4 and len(postal_line) <= 5:
-                                self.data["TRAEXPEX1"]["PosCodEX123"] = postal_line
-                                break
-                
-                break
-        
+                        self.data["TRAEXPEX1"]["CouEX125"] = country_line
+            
+            # Поштенски код - барај во адресата или во следните линии
+            # Прво провери дали е во адресата (формат: "Билеша 50/10,Белград" или со број на крај)
+            if "StrAndNumEX122" in self.data["TRAEXPEX1"]:
+                addr = self.data["TRAEXPEX1"]["StrAndNumEX122"]
+                postal_match = _RE_POSTAL_SUFFIX.search(addr)
+                if postal_match:
+                    self.data["TRAEXPEX1"]["PosCodEX123"] = postal_match.group(1)
+                else:
+                    # Барај во следните линии
+                    for j in range(i + 5, min(i + 10, len(self.lines))):
+                        postal_line = lines_stripped[j]
+                        if postal_line.isdigit() and len(postal_line) >= 4 and len(postal_line) <= 5:
+                            self.data["TRAEXPEX1"]["PosCodEX123"] = postal_line
+                            break
+
         # Ако не е најден поштенски код, постави на None
         if "PosCodEX123" not in self.data["TRAEXPEX1"]:
             self.data["TRAEXPEX1"]["PosCodEX123"] = None
@@ -244,61 +474,66 @@ class ECDExtractorCustoms(ECDExtractorGeneric):
         # Линија N+5: Град
         # Линија N+6: Земја (2-буквен код)
         
-        for i, line in enumerate(self.lines):
-            if '8 Примач' in line:
-                # Името е на линија i+2 (после "Не" на i+1)
-                if i + 2 < len(self.lines):
-                    name_line = self.lines[i + 2].strip()
-                    if name_line and len(name_line) > 3 and name_line != 'Не':
-                        self.data["TRACONCE1"]["NamCE17"] = name_line
-                
-                # Адресата е на линија i+3
-                if i + 3 < len(self.lines):
-                    addr_line = self.lines[i + 3].strip()
-                    if addr_line and addr_line != 'Не' and not re.match(r'^\d{4,6}$', addr_line):
-                        self.data["TRACONCE1"]["StrAndNumCE122"] = addr_line
-                        
-                        # Обиди се да го извлечеш градот од адресата (после запирка)
-                        # Формат: "Билецка 50/10,Белград" -> Град: "Белград"
-                        if ',' in addr_line:
-                            city_from_addr = addr_line.split(',')[-1].strip()
-                            if city_from_addr and len(city_from_addr) > 2:
-                                self.data["TRACONCE1"]["CitCE124"] = city_from_addr
-                
-                # Поштенски код е на линија i+4
-                if i + 4 < len(self.lines):
-                    postal_line = self.lines[i + 4].strip()
-                    if postal_line.isdigit() and len(postal_line) >= 4 and len(postal_line) <= 6:
-                        # Само ако не е сè нули
-                        if postal_line != '00000' and postal_line != '0000':
-                            self.data["TRACONCE1"]["PosCodCE123"] = postal_line
-                        else:
-                            self.data["TRACONCE1"]["PosCodCE123"] = None
-                
-                # Ако градот не е извлечен од адресата, обиди се да го земеш од линија i+5
-                # Но само ако не е ист како адресата (да избегнеме дупликати)
-                if "CitCE124" not in self.data["TRACONCE1"] or not self.data["TRACONCE1"]["CitCE124"]:
-                    if i + 5 < len(self.lines):
-                        city_line = self.lines[i + 5].strip()
-                        # Не го земај ако е ист како адресата или содржи запирка (веројатно е адреса)
-                        if (city_line and len(city_line) > 2 and len(city_line) < 50 and 
-                            city_line != 'Не' and not re.match(r'^[A-Z]{2}$', city_line) and
-                            ',' not in city_line and
-                            ("StrAndNumCE122" not in self.data["TRACONCE1"] or 
-                             city_line != self.data["TRACONCE1"]["StrAndNumCE122"])):
-                            self.data["TRACONCE1"]["CitCE124"] = city_line
-                
-                # Земјата е на линија i+6 (2-буквен код)
-                if i + 6 < len(self.lines):
-                    country_line = self.lines[i + 6].strip()
-                    if re.match(r'^[A-Z]{2}$', country_line):
-                        if country_line == "MK":
-                            self.data["TRACONCE1"]["CouCE125"] = "МК"
-                        else:
-                            self.data["TRACONCE1"]["CouCE125"] = country_line
-                
-                break
-        
+        # Евтина C-проверка на присуство пред каква било обработка
+        if '8 Примач' not in self.text:
+            self.data["TRACONCE1"]["TINCE159"] = None
+            return
+
+        prim = self._get_anchor_lines().get('prim')
+        lines_stripped = self._get_lines_stripped()
+        if prim:
+            i = prim[0]
+            # Името е на линија i+2 (после "Не" на i+1)
+            if i + 2 < len(self.lines):
+                name_line = lines_stripped[i + 2]
+                if name_line and len(name_line) > 3 and name_line != 'Не':
+                    self.data["TRACONCE1"]["NamCE17"] = name_line
+            
+            # Адресата е на линија i+3
+            if i + 3 < len(self.lines):
+                addr_line = lines_stripped[i + 3]
+                if addr_line and addr_line != 'Не' and not _RE_POSTAL_LINE.match(addr_line):
+                    self.data["TRACONCE1"]["StrAndNumCE122"] = addr_line
+                    
+                    # Обиди се да го извлечеш градот од адресата (после запирка)
+                    # Формат: "Билецка 50/10,Белград" -> Град: "Белград"
+                    if ',' in addr_line:
+                        city_from_addr = addr_line.split(',')[-1].strip()
+                        if city_from_addr and len(city_from_addr) > 2:
+                            self.data["TRACONCE1"]["CitCE124"] = city_from_addr
+            
+            # Поштенски код е на линија i+4
+            if i + 4 < len(self.lines):
+                postal_line = lines_stripped[i + 4]
+                if postal_line.isdigit() and len(postal_line) >= 4 and len(postal_line) <= 6:
+                    # Само ако не е сè нули
+                    if postal_line != '00000' and postal_line != '0000':
+                        self.data["TRACONCE1"]["PosCodCE123"] = postal_line
+                    else:
+                        self.data["TRACONCE1"]["PosCodCE123"] = None
+            
+            # Ако градот не е извлечен од адресата, обиди се да го земеш од линија i+5
+            # Но само ако не е ист како адресата (да избегнеме дупликати)
+            if "CitCE124" not in self.data["TRACONCE1"] or not self.data["TRACONCE1"]["CitCE124"]:
+                if i + 5 < len(self.lines):
+                    city_line = lines_stripped[i + 5]
+                    # Не го земај ако е ист како адресата или содржи запирка (веројатно е адреса)
+                    if (city_line and len(city_line) > 2 and len(city_line) < 50 and 
+                        city_line != 'Не' and not _RE_TWO_LETTERS.match(city_line) and
+                        ',' not in city_line and
+                        ("StrAndNumCE122" not in self.data["TRACONCE1"] or 
+                         city_line != self.data["TRACONCE1"]["StrAndNumCE122"])):
+                        self.data["TRACONCE1"]["CitCE124"] = city_line
+            
+            # Земјата е на линија i+6 (2-буквен код)
+            if i + 6 < len(self.lines):
+                country_line = lines_stripped[i + 6]
+                if _RE_TWO_LETTERS.match(country_line):
+                    if country_line == "MK":
+                        self.data["TRACONCE1"]["CouCE125"] = "МК"
+                    else:
+                        self.data["TRACONCE1"]["CouCE125"] = country_line
+
         # TIN - обично None за странски примачи во царински формат
         self.data["TRACONCE1"]["TINCE159"] = None
     
@@ -309,141 +544,119 @@ class ECDExtractorCustoms(ECDExtractorGeneric):
         # - "32 ... 33 Тарифна ознака" или "33 Тарифна" или "Тарифна ознака"
         # - commodity code на следната или истата линија
         
+        # Евтина C-проверка на присуство: без "Тарифн" маркер во
+        # текстот нема ставки, па целиот скен се прескокнува
+        if 'Тарифн' not in self.text:
+            self.data["GOOITEGDS"].append(self._create_empty_item())
+            return
+
         commodity_positions = []
+        # Дедупликација со dict наместо линеарен скен по листата - за
+        # секој код се памети последната прифатена линија, па проверката
+        # |линија - последна| < 2 е O(1) и точно го репродуцира
+        # прозорецот од ±1 линија
+        last_code_line = {}
         search_start = max(self.data_start_index, 30)
-        
-        i = search_start
-        while i < len(self.lines):
-            line = self.lines[i].strip()
+        lines_stripped = self._get_lines_stripped()
+
+        # Еден finditer во C ги наоѓа линиите со "Тарифна" маркер, па
+        # Python логиката работи само врз тие неколку кандидати наместо
+        # да ја проверува секоја линија од документот
+        line_starts = self._get_line_starts()
+        trigger_lines = set()
+        for anchor in _RE_TARIF.finditer(self.text):
+            line_idx = bisect.bisect_right(line_starts, anchor.start()) - 1
+            # Маркерот може да е и во "следната" линија на кандидатот
+            # (combined_line подолу), па и претходната линија е кандидат
+            trigger_lines.add(line_idx - 1)
+            trigger_lines.add(line_idx)
+
+        for i in sorted(trigger_lines):
+            if i < search_start or i >= len(self.lines):
+                continue
+            line = lines_stripped[i]
             combined_line = line
-            
+
             # Комбинирај ја оваа линија со следната за да компензираме за line breaks
             if i + 1 < len(self.lines):
-                combined_line = line + " " + self.lines[i + 1].strip()
-            
+                combined_line = line + " " + lines_stripped[i + 1]
+
             # Барај "33 Тарифна ознака" или "33 Тарифн" или само "Тарифна ознака"
-            if ('33 Тарифн' in combined_line or '33 Тарифна ознака' in combined_line or 
+            if ('33 Тарифн' in combined_line or '33 Тарифна ознака' in combined_line or
                 ('Тарифна ознака' in combined_line and '32' in combined_line)):
-                
+
                 # Барај 8-цифрен код на следните неколку линии
                 for j in range(i + 1, min(i + 5, len(self.lines))):
-                    check_line = self.lines[j].strip()
+                    check_line = lines_stripped[j]
                     # Барај 8-цифрен код во таа линија
-                    code_match = re.search(r'\b(\d{8})\b', check_line)
+                    code_match = _RE_CC8.search(check_line)
                     if code_match:
                         commodity_code = code_match.group(1)
                         # Провери дали веќе не го имаме овој код на оваа позиција
-                        if not any(abs(pos[0] - j) < 2 and pos[1] == commodity_code for pos in commodity_positions):
+                        pos = last_code_line.get(commodity_code)
+                        if pos is None or abs(pos - j) >= 2:
+                            last_code_line[commodity_code] = j
                             commodity_positions.append((j, commodity_code))
-                            if self.verbose:
-                                print(f"      Најдена ставка: {commodity_code} на линија {j}")
+                            self._log(f"      Најдена ставка: {commodity_code} на линија {j}")
                             break
-            i += 1
         
         if not commodity_positions:
             # Ако нема commodity codes, креирај празна ставка
             self.data["GOOITEGDS"].append(self._create_empty_item())
             return
         
-        if self.verbose:
-            print(f"   Вкупно најдени ставки: {len(commodity_positions)}")
+        self._log(f"   Вкупно најдени ставки: {len(commodity_positions)}")
         
-        # Извлечи ги сите ставки
+        desc_mask = self._get_desc_mask()
+
+        # Извлечи ги сите ставки. Полињата се собираат во паралелни
+        # листи (SoA) за време на скенирањето, а JSON речниците се
+        # градат еднаш на крајот - помалку мали алокации во циклусот
+        col_desc = []
+        col_gross = []
+        col_pack = []
+        col_docs = []
+
         for item_num, (commodity_index, commodity_code) in enumerate(commodity_positions, 1):
-            item = {
-                "IteNumGDS7": str(item_num),
-                "GroMasGDS46": None,
-                "GooDesGDS23": "",
-                "UNDanGooCodGDI1": None,
-                "COMCODGODITM": {
-                    "ComNomCMD1": commodity_code
-                },
-                "PACGS2": [],
-                "PRODOCDC2": []
-            }
+            desc = ""
+            gross = None
+            packages = []
+            docs = []
             
             # Одреди го опсегот за оваа ставка
             next_commodity_index = commodity_positions[item_num][0] if item_num < len(commodity_positions) else len(self.lines)
             item_start = max(0, commodity_index - 10)
             item_end = min(len(self.lines), next_commodity_index)
             
-            # Опис на стока - барај ПРЕД commodity code, обично после пакувањето
-            # Описот е директно после пакувањето и пред "Ознаки и броеви"
-            desc_found = False
-            # Барај наназад од commodity code до "31 Колети"
+            # Опис на стока - барај ПРЕД commodity code, обично после
+            # пакувањето: прва линија наназад означена како кандидат
             for i in range(commodity_index - 1, max(0, commodity_index - 15), -1):
-                line = self.lines[i].strip()
-                
-                # Прескокни "Ознаки и броеви" и "32 Не"
-                if ('Ознаки и броеви' in line or line == '32' or line == 'Не' or 
-                    line.startswith('33 ') or line.isdigit()):
-                    continue
-                
-                # Прескокни линии со пакување (формати: "Взаемно определено-X-YY" или "Палета-X-YY")
-                if (re.search(r'(Взаемно определено|Палета|Картон|Кутија|Сандак)-\d+-[A-Z]{2}', line) or
-                    'на стока' in line or 'опис' in line or 'Колети' in line or line.startswith('31 ')):
-                    continue
-                
-                # Барај линија со опис (кирилични букви, подолга од 5 карактери)
-                if (line and len(line) >= 5 and 
-                    # Провери дали има кирилични букви или латинични букви (за стоки со латинични имиња)
-                    (any(ord(c) >= 1040 and ord(c) <= 1103 for c in line) or 
-                     any(c.isupper() for c in line)) and
-                    # Не е маркер или поле
-                    not line.startswith('32 ') and
-                    not line.startswith('33 ') and
-                    not line.startswith('34 ') and
-                    not line.startswith('35 ') and
-                    not line.startswith('37 ') and
-                    not line.startswith('38 ') and
-                    not line.startswith('39 ') and
-                    not line.startswith('40 ') and
-                    not line.startswith('41 ') and
-                    not line.startswith('44 ') and
-                    not line.startswith('46 ') and
-                    'Бруто маса' not in line and
-                    'Нето маса' not in line and
-                    'Квота' not in line and
-                    'ПОСТАПКА' not in line and
-                    # Не е само број или код
-                    not re.match(r'^\d+\.?\d*$', line) and
-                    not re.match(r'^[A-Z]{2}$', line)):
-                    # Ова изгледа како опис
-                    item["GooDesGDS23"] = line.rstrip(',').strip()
-                    desc_found = True
-                    if self.verbose:
-                        print(f"      Опис: {item['GooDesGDS23']}")
+                if desc_mask[i]:
+                    desc = lines_stripped[i].rstrip(',').strip()
+                    self._log(f"      Опис: {desc}")
                     break
             
-            # Бруто маса - барај "35 Бруто маса" во опсегот
-            for i in range(item_start, item_end):
-                if '35 Бруто маса' in self.lines[i]:
-                    # Следната линија содржи маса
-                    for j in range(i + 1, min(i + 10, item_end)):
-                        mass_line = self.lines[j].strip()
-                        # Барај број со decimal point
-                        mass_match = re.search(r'(\d+\.?\d*)', mass_line)
-                        if mass_match:
-                            try:
-                                mass = float(mass_match.group(1))
-                                item["GroMasGDS46"] = mass
-                                if self.verbose:
-                                    print(f"      Маса: {mass}")
-                                break
-                            except ValueError:
-                                pass
-                    break
+            # Бруто маса - барај "35 Бруто маса" во опсегот (од индексот)
+            gross_idx = self._first_anchor_in_range('gross35', item_start, item_end)
+            if gross_idx >= 0:
+                # Следната линија содржи маса
+                for j in range(gross_idx + 1, min(gross_idx + 10, item_end)):
+                    mass = _first_float(lines_stripped[j])
+                    if mass is not None:
+                        gross = mass
+                        self._log(f"      Маса: {mass}")
+                        break
             
             # Пакување - барај "31 Колети" и type code
             # Поддржани формати:
             # 1. Стар формат: "Взаемно определено-24-ZZ"
             # 2. Нов формат: "Палета-14-PX" или "Картон-5-CT"
             for i in range(item_start, commodity_index + 3):
-                line = self.lines[i].strip()
+                line = lines_stripped[i]
                 
                 # Стар формат
                 if 'Взаемно определено' in line:
-                    pack_match = re.search(r'определено-(\d+)-([A-Z]{2})', line)
+                    pack_match = _RE_PACK_OLD.search(line)
                     if pack_match:
                         num_packages = pack_match.group(1)
                         pack_type = pack_match.group(2)
@@ -452,13 +665,12 @@ class ECDExtractorCustoms(ECDExtractorGeneric):
                             "NumOfPacGS24": num_packages,
                             "MarNumOfPacGS21": None
                         }
-                        item["PACGS2"].append(package)
-                        if self.verbose:
-                            print(f"      Пакување: {num_packages} x {pack_type}")
+                        packages.append(package)
+                        self._log(f"      Пакување: {num_packages} x {pack_type}")
                         break
                 
                 # Нов формат: "Палета-14-PX", "Картон-5-CT", "Кутија-10-BX", итн.
-                pack_match = re.search(r'(Палета|Картон|Кутија|Сандак|Врека|Контејнер)-(\d+)-([A-Z]{2})', line)
+                pack_match = _RE_PACK_NEW.search(line)
                 if pack_match:
                     num_packages = pack_match.group(2)
                     pack_type = pack_match.group(3)
@@ -467,71 +679,77 @@ class ECDExtractorCustoms(ECDExtractorGeneric):
                         "NumOfPacGS24": num_packages,
                         "MarNumOfPacGS21": None
                     }
-                    item["PACGS2"].append(package)
-                    if self.verbose:
-                        print(f"      Пакување: {num_packages} x {pack_type} ({pack_match.group(1)})")
+                    packages.append(package)
+                    self._log(f"      Пакување: {num_packages} x {pack_type} ({pack_match.group(1)})")
                     break
             
             # Previous documents - барај "44 Дополнителни информации"
             # Може да биде и до 30 линии после commodity code
-            for i in range(commodity_index, min(commodity_index + 35, item_end)):
-                line = self.lines[i].strip()
-                if '44 Дополнителни' in line:
-                    # Следните неколку линии содржат документи
-                    # Може да се распространети на повеќе линии
-                    doc_text = ""
-                    for j in range(i + 1, min(i + 6, len(self.lines))):
-                        next_line = self.lines[j].strip()
-                        # Прекини ако се најде нов маркер (46, 47, 31, итн.)
-                        if (next_line.startswith('46 ') or next_line.startswith('47 ') or 
-                            next_line.startswith('31 ') or next_line.startswith('Шифр')):
-                            break
-                        # Прескокни линии со "информации" или "проложени"
-                        if 'информации' in next_line or 'проложени' in next_line:
-                            continue
-                        doc_text += " " + next_line
-                    
-                    if doc_text:
-                        # Парсирај документи: "AUN-MK19..., POAN-MK26..., 5016-0052639, 5011-93015589"
-                        # Поддршка за формати: CODE-REFERENCE или CODE-REFERENCE/YEAR
-                        # Исто така поддршка за прекинати линии: "POAN- MK22POA..." (со празно место)
-                        
-                        # Прво отстрани ги непотребните празни места после цртички
-                        doc_text = re.sub(r'-\s+', '-', doc_text)
-                        
-                        doc_patterns = [
-                            r'([A-Z\d]+)-([A-Z\d]+/\d{4})',  # Format: CODE-REF/YEAR
-                            r'([A-Z\d]+)-([A-Z\d/]+)'         # Format: CODE-REF or CODE-REF/SOMETHING
-                        ]
-                        
-                        found_docs = set()  # За да избегнеме дупликати
-                        for doc_pattern in doc_patterns:
-                            for match in re.finditer(doc_pattern, doc_text):
-                                doc_type = match.group(1)
-                                doc_ref = match.group(2)
-                                doc_key = f"{doc_type}-{doc_ref}"
-                                
-                                # Провери дали е валиден тип на документ
-                                if (doc_key not in found_docs and 
-                                    doc_type in ['AUN', 'POAN', '5016', '5011', 'Y024', '5010', '5069', 
-                                                 'T010', 'E042', '2037']):
-                                    item["PRODOCDC2"].append({
-                                        "DocTypDC21": doc_type,
-                                        "DocRefDC23": doc_ref
-                                    })
-                                    found_docs.add(doc_key)
-                                    if self.verbose:
-                                        print(f"      Документ: {doc_type}-{doc_ref}")
-                    break
+            doc_idx = self._first_anchor_in_range(
+                'doc44', commodity_index, min(commodity_index + 35, item_end))
+            if doc_idx >= 0:
+                # Следните неколку линии содржат документи
+                # Може да се распространети на повеќе линии
+                doc_text = ""
+                for j in range(doc_idx + 1, min(doc_idx + 6, len(self.lines))):
+                    next_line = lines_stripped[j]
+                    # Прекини ако се најде нов маркер (46, 47, 31, итн.)
+                    if next_line.startswith(_DOC_END_PREFIXES):
+                        break
+                    # Прескокни линии со "информации" или "проложени"
+                    if 'информации' in next_line or 'проложени' in next_line:
+                        continue
+                    doc_text += " " + next_line
             
-            self.data["GOOITEGDS"].append(item)
+                # Сите формати на документи содржат цртичка - без неа
+                # нема што да се парсира, па regex-ите се прескокнуваат
+                if doc_text and '-' in doc_text:
+                    # Парсирај документи: "AUN-MK19..., POAN-MK26..., 5016-0052639, 5011-93015589"
+                    # Поддршка за формати: CODE-REFERENCE или CODE-REFERENCE/YEAR
+                    # Исто така поддршка за прекинати линии: "POAN- MK22POA..." (со празно место)
+
+                    # Прво отстрани ги непотребните празни места после цртички
+                    doc_text = _RE_DASH_SPACE.sub('-', doc_text)
+
+                    found_docs = set()  # За да избегнеме дупликати
+                    for match in _RE_DOC_VALID.finditer(doc_text):
+                        doc_type = match.group(1)
+                        doc_ref = match.group(2)
+                        doc_key = f"{doc_type}-{doc_ref}"
+                        if doc_key not in found_docs:
+                            docs.append({
+                                "DocTypDC21": doc_type,
+                                "DocRefDC23": doc_ref
+                            })
+                            found_docs.add(doc_key)
+                            self._log(f"      Документ: {doc_type}-{doc_ref}")
+            
+            col_desc.append(desc)
+            col_gross.append(gross)
+            col_pack.append(packages)
+            col_docs.append(docs)
+
+        # Материјализирај ги JSON речниците со еден помин низ колоните
+        self.data["GOOITEGDS"].extend(
+            {
+                "IteNumGDS7": str(num),
+                "GroMasGDS46": gross,
+                "GooDesGDS23": desc,
+                "UNDanGooCodGDI1": None,
+                "COMCODGODITM": {
+                    "ComNomCMD1": code
+                },
+                "PACGS2": packages,
+                "PRODOCDC2": docs
+            }
+            for num, ((_, code), gross, desc, packages, docs) in enumerate(
+                zip(commodity_positions, col_gross, col_desc,
+                    col_pack, col_docs), 1)
+        )
 
 
 def main():
     """Тестирање на екстракторот за царински формат"""
-    import sys
-    import json
-    
     pdf_path = "ECDcarina.pdf" if len(sys.argv) < 2 else sys.argv[1]
     output_path = "extracted_customs.json"
     